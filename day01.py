@@ -51,29 +51,91 @@ What is the first frequency your device reaches twice?
 """
 
 import sys
+from array import array
+from itertools import accumulate
+
+
+def readShifts(stream):
+    """ Reads all shifts from a stream in one call;
+        returns them parsed once into a compact integer array. """
+
+    return array('q', map(int, stream.read().split()))
+
 
 def applyShifts(freq, shifts):
     """ Applies a list of shifts to a starting frequency;
         returns resulting frequency. """
 
-    # apply all shifts
-    for shift in shifts:
-        freq = applyShift(freq, shift)
+    # apply all shifts at once
+    return freq + sum(shifts)
 
-    return freq
 
+class FrequencyBitmap:
+    """ Set of frequencies stored as one bit each, offset from the
+        lowest frequency covered; at least doubles as the range widens. """
 
-def applyShift(freq, shift):
-    """ Applies a single shift to a starting frequency;
-        returns resulting frequency. """
-    
-    # get shift value
-    number = int(shift[1:])
-    if shift[0] == "-":     # negate if needed
-        number = 0 - number
+    CHUNK  = 1 << 12    # fewest bytes added per growth
+    SPARSE = 512        # range per frequency seen beyond which a set is smaller
+
+    def __init__(self, low, high):
+        self.low = low
+        self.bits = bytearray((high - low) // 8 + 1)
+
+    def __contains__(self, freq):
+        pos = freq - self.low
+        if pos < 0 or pos >= len(self.bits) * 8:
+            return False
+        return self.bits[pos >> 3] >> (pos & 7) & 1 == 1
+
+    def __iter__(self):
+        for i, byte in enumerate(self.bits):
+            if byte:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield self.low + i * 8 + bit
+
+    def high(self):
+        """ Returns the highest frequency covered. """
+
+        return self.low + len(self.bits) * 8 - 1
 
-    # apply to frequency
-    return freq + number
+    def add(self, freq):
+        """ Marks a frequency as seen, widening the range if needed. """
+
+        # widen range below or above as needed
+        pos = freq - self.low
+        if pos < 0:
+            grow = max(-pos // 8 + 1, len(self.bits), self.CHUNK)
+            self.bits[:0] = bytearray(grow)
+            self.low -= grow * 8
+            pos = freq - self.low
+        elif pos >= len(self.bits) * 8:
+            grow = max(pos // 8 - len(self.bits) + 1, len(self.bits),
+                       self.CHUNK)
+            self.bits.extend(bytearray(grow))
+
+        self.bits[pos >> 3] |= 1 << (pos & 7)
+
+
+def isSparse(low, high, count):
+    """ Determines whether a bitmap over low..high would be mostly empty
+        for the given number of frequencies (a set is smaller then). """
+
+    return high - low > FrequencyBitmap.SPARSE * (count + 1) + \
+        FrequencyBitmap.CHUNK * 8
+
+
+def remember(seen, freq, count):
+    """ Adds a frequency to a bitmap or set of count frequencies seen,
+        switching to a set once the bitmap would be mostly empty;
+        returns the container now holding them. """
+
+    if isinstance(seen, FrequencyBitmap) and \
+       isSparse(min(seen.low, freq), max(seen.high(), freq), count):
+        seen = set(seen)
+
+    seen.add(freq)
+    return seen
 
 
 def findDupFrequency(freq, shifts):
@@ -81,13 +143,22 @@ def findDupFrequency(freq, shifts):
         tracks resulting frequencies seen;
         returns first duplicate (repeated) frequency. """
 
-    seen = set()  # frequencies seen so far
+    # size tracker from the range of the first pass
+    low = high = freq
+    for prefix in accumulate(shifts, initial=freq):
+        low, high = min(low, prefix), max(high, prefix)
+    if isSparse(low, high, len(shifts)):
+        seen = set()
+    else:
+        seen = FrequencyBitmap(low, high)
+    count = 0     # frequencies seen so far
     index = 0     # current shift index
 
     # apply shifts until find repeated frequency
     while freq not in seen:
-        seen.add(freq)
-        freq = applyShift(freq, shifts[index])
+        seen = remember(seen, freq, count)
+        count += 1
+        freq += shifts[index]
         
         # repeat through list multiple times as needed
         index = (index + 1) % len(shifts)
@@ -95,18 +166,124 @@ def findDupFrequency(freq, shifts):
     return freq
 
 
+def solveDupFrequency(freq, shifts):
+    """ Finds the first duplicate frequency from a single pass of prefix
+        sums instead of replaying the list; returns None if the frequencies
+        never repeat. """
+
+    # get frequencies reached during the first pass
+    prefixes = array('q', accumulate(shifts, initial=freq))
+    drift = prefixes.pop() - freq
+    seen = set()
+    for prefix in prefixes:
+
+        # repeated within the first pass
+        if prefix in seen:
+            return prefix
+        seen.add(prefix)
+
+    return findCycleRepeat(prefixes, drift)
+
+
+def findCycleRepeat(prefixes, drift):
+    """ Given the distinct frequencies of one pass and the pass's net drift,
+        returns the first frequency repeated when the pass is cycled
+        (None if never repeated). """
+
+    # no shifts to repeat
+    if not prefixes:
+        return None
+
+    # no drift: the first frequency comes back after one pass
+    if drift == 0:
+        return prefixes[0]
+
+    # index of each frequency in the pass
+    index = {prefix: i for i, prefix in enumerate(prefixes)}
+
+    # group frequencies that can reach each other after whole passes
+    groups = {}
+    for prefix in prefixes:
+        groups.setdefault(prefix % abs(drift), []).append(prefix)
+
+    # each frequency first repeats its nearest neighbor in the drift direction
+    best = None     # (steps taken, repeated frequency)
+    for group in groups.values():
+        group.sort(reverse=drift < 0)
+        for start, end in zip(group, group[1:]):
+            passes = abs(end - start) // abs(drift)
+            steps = passes * len(prefixes) + index[start]
+            if best is None or steps < best[0]:
+                best = (steps, end)
+
+    # no frequencies line up across passes
+    if best is None:
+        return None
+
+    return best[1]
+
+
+class FrequencyTracker:
+    """ Applies shifts as they arrive, keeping the running frequency and
+        the first duplicate frequency seen so far. """
+
+    def __init__(self, freq=0):
+        self.start = freq
+        self.frequency = freq
+        self.duplicate = None           # first repeated frequency
+        self.prefixes = array('q')      # frequency before each shift
+        self.seen = FrequencyBitmap(freq, freq)
+        self.seen.add(freq)
+
+    def add(self, shift):
+        """ Applies a single shift; returns first duplicate so far. """
+
+        self.prefixes.append(self.frequency)
+        self.frequency += shift
+
+        # check for repeat
+        if self.duplicate is None:
+            if self.frequency in self.seen:
+                self.duplicate = self.frequency
+            else:
+                self.seen = remember(self.seen, self.frequency,
+                                     len(self.prefixes))
+
+        return self.duplicate
+
+    def extend(self, shifts):
+        """ Applies a batch of shifts; returns first duplicate so far. """
+
+        for shift in shifts:
+            self.add(shift)
+        return self.duplicate
+
+    def cycledDuplicate(self):
+        """ Returns the first duplicate if the shifts so far were repeated
+            over and over (None if never repeated). """
+
+        # a repeat within the stream comes first either way
+        if self.duplicate is not None:
+            return self.duplicate
+
+        return findCycleRepeat(self.prefixes, self.frequency - self.start)
+
+
 def main():
 
     # get input
-    frequencyShifts = [line.strip() for line in sys.stdin.readlines()]
+    frequencyShifts = readShifts(sys.stdin)
     
     # PART 1
     frequency = applyShifts(0, frequencyShifts)
     print("The resulting frequency is:", frequency)
 
     # PART 2
-    dupfrequency = findDupFrequency(0, frequencyShifts)
-    print("The first repeated frequency is:", dupfrequency)
+    dupfrequency = solveDupFrequency(0, frequencyShifts)
+    if dupfrequency is None:
+        print("The frequencies never repeat.")
+    else:
+        print("The first repeated frequency is:", dupfrequency)
     
 if __name__ == "__main__":
     main()
@@ -41,11 +41,22 @@ The IDs abcde and axcye are close, but they differ by two characters (the second
 What letters are common between the two correct box IDs? (In the example above, this is found by removing the differing character from either ID, producing fgij.)
 """
 
-import sys
+import mmap, os, sys
+from multiprocessing import Pool
+from collections import Counter
 
 def findChecksum(boxIDs):
     """ Returns the checksum as described in prompt, given list of box IDs. """
 
+    # return product for checksum
+    containsTwo, containsThree = countRepeats(boxIDs)
+    return containsTwo * containsThree
+
+
+def countRepeats(boxIDs):
+    """ Returns the number of boxes w a 2-letter count and the number w a
+        3-letter count, given any iterable of box IDs. """
+
     containsTwo   = 0   # number of boxes w 2-letter count
     containsThree = 0   # number of boxes w 3-letter count
 
@@ -59,46 +70,156 @@ def findChecksum(boxIDs):
         if 3 in counts:
             containsThree += 1
 
-    # return product for checksum
+    return containsTwo, containsThree
+
+
+def findFileChecksum(path, processes=1):
+    """ Returns the checksum for the box IDs in a file, streaming through
+        a memory map; splits the file at newlines across processes. """
+
+    # nothing to map
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+
+    # split file into ranges ending at newlines
+    bounds = [0]
+    with open(path, "rb") as file, \
+         mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for i in range(1, processes):
+            end = data.find(b"\n", max(size * i // processes, bounds[-1]))
+            bounds.append(size if end == -1 else end + 1)
+    bounds.append(size)
+    ranges = [(path, start, end) for start, end in zip(bounds, bounds[1:])]
+
+    # count each range, in parallel if requested
+    if processes > 1:
+        with Pool(processes) as pool:
+            results = pool.starmap(countFileRange, ranges)
+    else:
+        results = [countFileRange(*ranges[0])]
+
+    # combine counts for checksum
+    containsTwo   = sum(two for two, three in results)
+    containsThree = sum(three for two, three in results)
     return containsTwo * containsThree
 
 
+def countFileRange(path, start, end):
+    """ Returns the 2-letter and 3-letter box counts for the IDs in a byte
+        range of a file. """
+
+    with open(path, "rb") as file, \
+         mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        data.seek(start)
+        return countRepeats(readIDs(data, end))
+
+
+def readIDs(data, end):
+    """ Yields stripped box IDs from a memory map up to a byte offset. """
+
+    while data.tell() < end:
+        line = data.readline().strip()
+        if line:
+            yield line.decode()
+
+
 def countLetters(ID):
     """ Returns a set of letter counts for an ID. """
 
-    counts = set()
-    for letter in ID:
-        counts.add(ID.count(letter))
-    return counts
+    return set(Counter(ID).values())
 
 
 def findCommonID(boxIDs):
     """ Returns the common letters of the 2 IDs that are only 1 letter apart,
         given list of box IDs. """
 
-    # for every pair of IDs
-    for i in range(len(boxIDs) - 1):
-        for j in range(i, len(boxIDs)):
+    # use the first pair found
+    pairs = findNearPairs(boxIDs)
+    if pairs:
+        i, j = pairs[0]
+        return getCommonLetters(boxIDs[i], boxIDs[j])
 
-            # check their differences
-            diff = 0
-            A = boxIDs[i]
-            B = boxIDs[j]
-            for p in range(len(A)):
+    return ""
 
-                # found a difference
-                if A[p] != B[p]:
-                    diff += 1
 
-                # stop looking if more than 1 apart
-                if diff > 1:
-                    break
+def findNearPairs(boxIDs):
+    """ Returns index pairs (i, j), i < j, of every two IDs that differ in
+        exactly one position, given list of box IDs. """
 
-            # if only 1 apart, return their common letters
-            if diff == 1:
-                return getCommonLetters(A, B)
+    # group IDs by each position masked out
+    buckets = {}
+    for i, ID in enumerate(boxIDs):
+        for p in range(len(ID)):
+            buckets.setdefault((p, ID[:p] + ID[p+1:]), []).append(i)
 
-    return ""
+    # IDs sharing a bucket match everywhere but the masked position
+    pairs = []
+    for bucket in buckets.values():
+        for a in range(len(bucket) - 1):
+            for b in range(a + 1, len(bucket)):
+                i, j = bucket[a], bucket[b]
+
+                # skip identical IDs
+                if boxIDs[i] != boxIDs[j]:
+                    pairs.append((i, j))
+
+    return sorted(pairs)
+
+
+class BoxCatalog:
+    """ Index of box IDs for finding every ID within k differing letters of
+        a query. IDs are split into k + 1 blocks; any ID within k letters
+        must match the query exactly on at least one block. """
+
+    def __init__(self, boxIDs, k=1):
+        self.boxIDs = list(boxIDs)
+        self.k = k
+
+        # bucket IDs by each of their blocks
+        self.buckets = {}
+        for i, ID in enumerate(self.boxIDs):
+            for key in self.blockKeys(ID):
+                self.buckets.setdefault(key, []).append(i)
+
+    def blockKeys(self, ID):
+        """ Returns the bucket key of each block of an ID. """
+
+        parts = self.k + 1
+        keys = []
+        for b in range(parts):
+            start = b * len(ID) // parts
+            end = (b + 1) * len(ID) // parts
+            keys.append((len(ID), b, ID[start:end]))
+        return keys
+
+    def search(self, query, k=None):
+        """ Returns indices of IDs that differ from the query in at most k
+            positions (up to the catalog's k). """
+
+        k = self.k if k is None else min(k, self.k)
+
+        # gather candidates sharing a block with the query
+        candidates = set()
+        for key in self.blockKeys(query):
+            candidates.update(self.buckets.get(key, []))
+
+        # keep candidates close enough
+        return sorted(i for i in candidates
+                      if countDifferences(query, self.boxIDs[i], k) <= k)
+
+
+def countDifferences(A, B, limit):
+    """ Returns the number of positions where A and B differ, stopping
+        once more than limit are found. """
+
+    diff = 0
+    for a, b in zip(A, B):
+        if a != b:
+            diff += 1
+            if diff > limit:
+                break
+    return diff
 
 
 def getCommonLetters(A, B):
@@ -113,6 +234,12 @@ def getCommonLetters(A, B):
     
 def main():
 
+    # stream checksum from a file if given
+    if len(sys.argv) > 1:
+        checksum = findFileChecksum(sys.argv[1], os.cpu_count() or 1)
+        print("The checksum is:", checksum)
+        return
+
     # get input
     boxIDs = [line.strip() for line in sys.stdin.readlines()]
 
@@ -55,88 +55,353 @@ What is the ID of the only claim that doesn't overlap?
 """
 
 import re, sys
+from array import array
+from itertools import accumulate
+from multiprocessing import Pool
+from operator import add
 
 
-def processClaim(fabric, overlapped, claim):
-    """ Adds a claim to a fabric grid that tracks number of claims on each
-        spot in the grid and IDs of previous claims. """
+def rasterizeClaims(claims):
+    """ Builds a fabric grid holding the number of claims on each spot,
+        using a difference grid (four updates per claim) and cumulative
+        sums along each axis. """
 
-    ID, x, y, width, height = claim
+    # size fabric from claim extents
+    width  = max((x + w for ID, x, y, w, h in claims), default=0)
+    height = max((y + h for ID, x, y, w, h in claims), default=0)
+    fabric = [array('i', [0]) * (width + 1) for _ in range(height + 1)]
 
-    # add rows as needed
-    while y + height > len(fabric):
-        fabric.append([[0,-1]] * len(fabric[0]))
+    # mark corners of each claim
+    for ID, x, y, w, h in claims:
+        fabric[y][x] += 1
+        fabric[y][x + w] -= 1
+        fabric[y + h][x] -= 1
+        fabric[y + h][x + w] += 1
 
-    # add cols as needed
-    for i in range(len(fabric)):
-        while x + width > len(fabric[i]):
-            fabric[i].append([0,-1])
+    # sum across each row, then down each column
+    above = array('i', [0]) * (width + 1)
+    for i in range(height + 1):
+        row = array('i', accumulate(fabric[i]))
+        fabric[i] = above = array('i', map(add, above, row))
 
-    # visit every spot in claim on fabric
-    for i in range(y, y + height):
-        for j in range(x, x + width):
-
-            # mark if overlapping another claim
-            count, prevID = fabric[i][j]
-            if count != 0:
-                overlapped[prevID] = 1
-                overlapped[ID - 1] = 1  # IDs start at 1, indices start at 0
-
-            # update claim count for spot
-            fabric[i][j] = [count + 1, ID - 1]
+    return fabric
 
 
 def findOverlapping(fabric):
     """ Tallies the overlapping square inches given a fabric grid. """
 
-    total = 0
-    for row in fabric:
-        for spot in row:
-            if spot[0] > 1:
-                total += 1
+    return sum(len(row) - row.count(0) - row.count(1) for row in fabric)
 
-    return total
 
+def findNotOverlapped(fabric, claims):
+    """ Locates the ID of the claim whose spots are covered only once. """
 
-def findNotOverlapped(overlapped):
-    """ Locates the ID of the claim unmarked for overlapping. """
+    for ID, x, y, w, h in claims:
+        if all(max(fabric[i][x:x + w], default=1) == 1
+               for i in range(y, y + h)):
+            return ID
 
-    for i in range(len(overlapped)):
-        if overlapped[i] == 0:
-            return i + 1
-        
     return 0
 
 
+def findOverlappingTiled(claims, tileSize=1024, processes=1):
+    """ Rasterizes the fabric in square tiles, in parallel if requested;
+        returns the overlapping square inches and the sorted IDs of claims
+        not overlapping any other claim. """
+
+    # route each claim, clipped, to the tiles it touches
+    tiles = {}
+    for ID, x, y, w, h in claims:
+        for ty in range(y // tileSize, (y + h - 1) // tileSize + 1):
+            for tx in range(x // tileSize, (x + w - 1) // tileSize + 1):
+                left, top = tx * tileSize, ty * tileSize
+                cx, cy = max(x, left), max(y, top)
+                cw = min(x + w, left + tileSize) - cx
+                ch = min(y + h, top + tileSize) - cy
+                tiles.setdefault((tx, ty), []).append(
+                    [ID, cx - left, cy - top, cw, ch])
+
+    # rasterize each tile
+    if processes > 1:
+        with Pool(processes) as pool:
+            results = pool.map(rasterizeTile, tiles.values())
+    else:
+        results = [rasterizeTile(tile) for tile in tiles.values()]
+
+    # merge tile results
+    total = sum(area for area, overlapped in results)
+    overlapped = set().union(*[IDs for area, IDs in results])
+    return total, sorted(claim[0] for claim in claims
+                         if claim[0] not in overlapped)
+
+
+def rasterizeTile(claims):
+    """ Given claims clipped to a tile (relative to its corner), returns
+        the tile's overlapping square inches and the set of overlapped
+        claim IDs. """
+
+    fabric = rasterizeClaims(claims)
+    overlapped = {ID for ID, x, y, w, h in claims
+                  if any(max(fabric[i][x:x + w], default=1) > 1
+                         for i in range(y, y + h))}
+    return findOverlapping(fabric), overlapped
+
+
+class CoverageTree:
+    """ Segment tree over compressed y edges; tracks how much of the y
+        range is covered by at least one and at least two claims. """
+
+    def __init__(self, edges):
+        self.edges = edges
+        size = 4 * max(len(edges), 1)
+        self.count = [0] * size     # claims covering whole node
+        self.once  = [0] * size     # length covered >= 1 times
+        self.twice = [0] * size     # length covered >= 2 times
+
+    def update(self, low, high, delta, node=1, left=0, right=None):
+        """ Adds delta claims over edge indices [low, high). """
+
+        if right is None:
+            right = len(self.edges) - 1
+        if high <= left or right <= low:
+            return
+
+        # node entirely inside range
+        if low <= left and right <= high:
+            self.count[node] += delta
+
+        # recurse into halves
+        else:
+            mid = (left + right) // 2
+            self.update(low, high, delta, 2 * node, left, mid)
+            self.update(low, high, delta, 2 * node + 1, mid, right)
+
+        self.pull(node, left, right)
+
+    def pull(self, node, left, right):
+        """ Recomputes covered lengths of a node from its count and
+            children. """
+
+        full = self.edges[right] - self.edges[left]
+        leaf = right - left == 1
+        once  = 0 if leaf else self.once[2 * node] + self.once[2 * node + 1]
+        twice = 0 if leaf else self.twice[2 * node] + self.twice[2 * node + 1]
+
+        if self.count[node] >= 2:
+            self.once[node], self.twice[node] = full, full
+        elif self.count[node] == 1:
+            self.once[node], self.twice[node] = full, once
+        else:
+            self.once[node], self.twice[node] = once, twice
+
+    def doubled(self):
+        """ Returns the y length covered by two or more claims. """
+
+        return self.twice[1]
+
+
+def findOverlappingArea(claims):
+    """ Tallies the overlapping square inches by sweeping across claim
+        edges; no fabric grid needed. """
+
+    # compress y edges
+    edges = sorted({y for ID, x, y, w, h in claims} |
+                   {y + h for ID, x, y, w, h in claims})
+    if len(edges) < 2:
+        return 0
+    position = {y: i for i, y in enumerate(edges)}
+    tree = CoverageTree(edges)
+
+    # claims open at left edge, close at right edge
+    events = []
+    for ID, x, y, w, h in claims:
+        events.append((x, 1, position[y], position[y + h]))
+        events.append((x + w, -1, position[y], position[y + h]))
+    events.sort()
+
+    # sum doubled length between consecutive x edges
+    total = 0
+    lastX = events[0][0]
+    for x, delta, low, high in events:
+        total += tree.doubled() * (x - lastX)
+        tree.update(low, high, delta)
+        lastX = x
+
+    return total
+
+
+class ClaimIndex:
+    """ Uniform-bucket spatial index over claims for coverage queries.
+        Claims spanning more than LARGE buckets are kept in a separate
+        list that every query checks. """
+
+    LARGE = 16      # most buckets a claim is added to
+
+    def __init__(self, claims, size=None):
+        self.claims = {claim[0]: claim for claim in claims}
+
+        # default bucket about the size of a median claim
+        if size is None:
+            sides = sorted(max(w, h) for ID, x, y, w, h in claims)
+            size = max(sides[len(sides) // 2] if sides else 1, 1)
+        self.size = size
+
+        # add each claim to every bucket it touches (or to large claims)
+        self.buckets = {}
+        self.large = []
+        for ID, x, y, w, h in claims:
+            left, right, top, bottom = self.bucketRange(x, y, w, h)
+            if (right - left) * (bottom - top) > self.LARGE:
+                self.large.append(ID)
+                continue
+            for j in range(top, bottom):
+                for i in range(left, right):
+                    self.buckets.setdefault((i, j), []).append(ID)
+
+    def bucketRange(self, x, y, w, h):
+        """ Returns the column and row ranges [left, right), [top, bottom)
+            of the buckets a rectangle touches. """
+
+        size = self.size
+        return (x // size, max(x + w - 1, x) // size + 1,
+                y // size, max(y + h - 1, y) // size + 1)
+
+    def rectQuery(self, x, y, w, h):
+        """ Returns sorted IDs of claims intersecting a rectangle. """
+
+        # visit touched buckets, or every bucket if that's fewer
+        left, right, top, bottom = self.bucketRange(x, y, w, h)
+        if (right - left) * (bottom - top) > len(self.buckets):
+            buckets = [IDs for (i, j), IDs in self.buckets.items()
+                       if left <= i < right and top <= j < bottom]
+        else:
+            buckets = [self.buckets.get((i, j), [])
+                       for j in range(top, bottom)
+                       for i in range(left, right)]
+
+        found = set()
+        for IDs in buckets + [self.large]:
+            for ID in IDs:
+                if ID not in found and intersects(self.claims[ID],
+                                                   [0, x, y, w, h]):
+                    found.add(ID)
+        return sorted(found)
+
+    def pointQuery(self, x, y):
+        """ Returns sorted IDs of claims covering a square inch. """
+
+        return self.rectQuery(x, y, 1, 1)
+
+    def findNotOverlapped(self):
+        """ Returns sorted IDs of claims that overlap no other claim. """
+
+        return [ID for ID in sorted(self.claims)
+                if self.rectQuery(*self.claims[ID][1:]) == [ID]]
+
+
+class ClaimRegistry:
+    """ Mutable set of claims keeping the overlapping area and the IDs of
+        non-overlapping claims up to date as claims change. """
+
+    def __init__(self, claims=()):
+        self.claims   = {}      # ID -> claim
+        self.spots    = {}      # (x, y) -> IDs claiming spot
+        self.shared   = {}      # ID -> number of its spots overlapped
+        self.isolated = set()   # IDs overlapping no other claim
+        self.area     = 0       # square inches w two or more claims
+        for claim in claims:
+            self.add(claim)
+
+    def add(self, claim):
+        """ Adds a claim, replacing any claim with the same ID. """
+
+        ID, x, y, w, h = claim
+        if ID in self.claims:
+            self.remove(ID)
+        self.claims[ID] = claim
+        self.shared[ID] = 0
+
+        # visit every spot in claim
+        for i in range(y, y + h):
+            for j in range(x, x + w):
+                IDs = self.spots.setdefault((j, i), set())
+
+                # spot becomes overlapped: its previous claim now shares it
+                if len(IDs) == 1:
+                    self.area += 1
+                    self.share(next(iter(IDs)), 1)
+                if IDs:
+                    self.shared[ID] += 1
+                IDs.add(ID)
+
+        if self.shared[ID] == 0:
+            self.isolated.add(ID)
+
+    def remove(self, ID):
+        """ Withdraws the claim with the given ID. """
+
+        _, x, y, w, h = self.claims.pop(ID)
+        del self.shared[ID]
+        self.isolated.discard(ID)
+
+        # visit every spot in claim
+        for i in range(y, y + h):
+            for j in range(x, x + w):
+                IDs = self.spots[(j, i)]
+                IDs.discard(ID)
+
+                # spot no longer overlapped: its last claim has it alone
+                if len(IDs) == 1:
+                    self.area -= 1
+                    self.share(next(iter(IDs)), -1)
+                elif not IDs:
+                    del self.spots[(j, i)]
+
+    def share(self, ID, delta):
+        """ Adjusts a claim's count of overlapped spots. """
+
+        self.shared[ID] += delta
+        if self.shared[ID] == 0:
+            self.isolated.add(ID)
+        else:
+            self.isolated.discard(ID)
+
+
+def intersects(A, B):
+    """ Determines whether two claims share any square inch. """
+
+    _, ax, ay, aw, ah = A
+    _, bx, by, bw, bh = B
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
 def main():
 
     # get input
-    claims = [line.strip() for line in sys.stdin.readlines()]
+    lines = [line.strip() for line in sys.stdin.readlines()]
     
-    # define fabric grid and claim format
-    fabric = [[]]
-    overlapped = []
+    # define claim format
+    claims = []
     claimRE = re.compile("^#(\\d+) @ (\\d+),(\\d+): (\\d+)x(\\d+)$")
 
-    # process each claim
-    for claim in claims:
-
-        # extract values from claim and process
-        result = claimRE.match(claim)
+    # extract values from each claim
+    for line in lines:
+        result = claimRE.match(line)
         if result:
-            overlapped.append(0)
-            processClaim(fabric, overlapped,
-                         [int(result.group(i)) for i in range(1,6)])
+            claims.append([int(result.group(i)) for i in range(1,6)])
 
     # PART ONE
     # tally overlapping claims
     print("There are {} square inches of fabric "
-          "with one or more claims.".format(findOverlapping(fabric)))
+          "with one or more claims.".format(findOverlappingArea(claims)))
 
     # PART TWO
     # report non-overlapped claim
-    print("Claim #{} is not overlapping any other claim."
-          "".format(findNotOverlapped(overlapped)))
+    notOverlapped = ClaimIndex(claims).findNotOverlapped()
+    for ID in notOverlapped:
+        print("Claim #{} is not overlapping any other claim.".format(ID))
+    if not notOverlapped:
+        print("Every claim is overlapping another claim.")
     
     
 if __name__ == "__main__":
@@ -53,99 +53,585 @@ In the example above, Guard #99 spent minute 45 asleep more than any other guard
 What is the ID of the guard you chose multiplied by the minute you chose? (In the above example, the answer would be 99 * 45 = 4455.)
 """
 
-import re, sys
+import bisect, heapq, re, struct, sys, tempfile, time
+from array import array
+from datetime import date
+from itertools import accumulate
+
+# event codes
+BEGIN = 0
+SLEEP = 1
+WAKE  = 2
+
+# packed (key, event, guard) record in run files
+RECORD = struct.Struct("<qbq")
+
+# sleep history file header (magic, number of guards) and per-guard
+# header (guard ID, number of nights)
+HISTORY_MAGIC  = b"SLPH"
+HISTORY_HEADER = struct.Struct("<4sq")
+HISTORY_GUARD  = struct.Struct("<qq")
+
+# memory used per byte of log while a chunk is parsed and sorted
+CHUNK_OVERHEAD = 8
+
+# date/time and action of a single log entry
+ENTRY = re.compile(r"\[(\d+)-(\d+)-(\d+) (\d+):(\d+)\] "
+                   r"(?:Guard #(\d+) begins shift|(falls asleep)|wakes up)")
+
+
+def parseLog(text):
+    """ Scans a whole log for entries; returns packed arrays of minute keys
+        (minutes since 0001-01-01), event codes and guard IDs (-1 unless
+        a guard begins shift). Reports lines that aren't entries. """
+
+    keys   = array('q')
+    events = array('b')
+    guards = array('q')
+    for line in text.splitlines():
+
+        # extract date/time and action
+        entry = ENTRY.match(line.strip())
+        if not entry:
+            if line.strip():
+                print("Couldn't find a date in this line:", line.strip())
+            continue
+        year, month, day, hour, minute, guard, sleep = entry.groups()
 
+        # store date/time as a single integer
+        day = date(int(year), int(month), int(day)).toordinal()
+        keys.append(day * 1440 + int(hour) * 60 + int(minute))
 
-def main():
+        # store action
+        if guard:
+            events.append(BEGIN)
+            guards.append(int(guard))
+        else:
+            events.append(SLEEP if sleep else WAKE)
+            guards.append(-1)
 
-    # get input
-    lines = [line.strip() for line in sys.stdin.readlines()]
-    
-    # define regex for processing the input
-    RDateTime = re.compile("\[(\d+)-(\d+)-(\d+) (\d+):(\d+)\]")
-    RBegin    = re.compile("Guard #(\d+) begins shift")
-    RSleep    = re.compile("falls asleep")
-    RAwake    = re.compile("wakes up")
-
-    # separate date/time from action in each line
-    for i in range(len(lines)):
-        line = lines[i]
-
-        # extract date/time
-        lineDateTime = RDateTime.search(line)
-        if not lineDateTime:
-            print("Couldn't find a date in this line:", line)
-            continue
+    return keys, events, guards
+
+
+def sortLog(keys, events, guards):
+    """ Sorts packed log arrays chronologically by minute key. """
+
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    return (array('q', [keys[i] for i in order]),
+            array('b', [events[i] for i in order]),
+            array('q', [guards[i] for i in order]))
+
+
+class SleepMatrix:
+    """ Guards x minutes matrix of nights asleep, filled with difference
+        ranges; span sets how many minutes after midnight each row
+        covers. """
+
+    def __init__(self, span=60):
+        self.span   = span
+        self.guards = []          # guard ID of each row
+        self.rows   = {}          # guard ID -> row
+        self.diff   = array('i')  # row-wise difference counts
+        self.counts = None        # row-wise counts once built
+
+    def addGuard(self, guard):
+        """ Adds an empty row for a guard if needed. """
+
+        if guard not in self.rows:
+            self.rows[guard] = len(self.guards)
+            self.guards.append(guard)
+            self.diff.extend(array('i', [0]) * (self.span + 1))
+
+    def addInterval(self, guard, start, end):
+        """ Marks a guard asleep from minute start up to (not incl.) end. """
+
+        self.addGuard(guard)
+        row = self.rows[guard] * (self.span + 1)
+        self.diff[row + start] += 1
+        self.diff[row + end] -= 1
+        self.counts = None
+
+    def build(self):
+        """ Sums difference rows into counts; returns flat count array. """
+
+        if self.counts is None:
+            width = self.span + 1
+            self.counts = array('i')
+            for row in range(len(self.guards)):
+                diff = self.diff[row * width:(row + 1) * width - 1]
+                self.counts.extend(array('i', accumulate(diff)))
+        return self.counts
+
+    def row(self, guard):
+        """ Returns a guard's counts for each minute. """
+
+        start = self.rows[guard] * self.span
+        return self.build()[start:start + self.span]
+
+    def strategyOne(self):
+        """ Returns the guard asleep the most and their sleepiest minute. """
+
+        totals = [sum(self.row(guard)) for guard in self.guards]
+        guard = self.guards[argmax(totals)]
+        return guard, argmax(self.row(guard))
+
+    def strategyTwo(self):
+        """ Returns the guard and minute most often slept together. """
+
+        row, minute = divmod(argmax(self.build()), self.span)
+        return self.guards[row], minute
+
+
+def argmax(values):
+    """ Returns the index of the first largest value. """
+
+    return max(range(len(values)), key=values.__getitem__)
+
+
+def sortLogExternal(stream, budget=1 << 24, fanIn=16):
+    """ Sorts a log too large for memory within about budget bytes: sorts
+        chunks into temporary run files, then merges at most fanIn runs at
+        a time; yields (key, event, guard) records chronologically. """
+
+    # a chunk takes several times its size while parsed and sorted
+    chunkSize = max(budget // CHUNK_OVERHEAD, 1)
+
+    # each merged run gets an equal share of the budget to read with
+    block = max(budget // fanIn // RECORD.size, 1)
+
+    opened = []     # every run file, for cleanup
+    levels = []     # runs by number of times merged
+    try:
+        while True:
+            lines = stream.readlines(chunkSize)
+            if not lines:
+                break
+            text = "".join(lines)
+            del lines
+            run = writeRun(zip(*sortLog(*parseLog(text))))
+            opened.append(run)
+            del text
+
+            # merge a level once it has fanIn runs, cascading upward
+            level = 0
+            while True:
+                if level == len(levels):
+                    levels.append([])
+                levels[level].append(run)
+                if len(levels[level]) < fanIn:
+                    break
+                run = writeRun(mergeRuns(levels[level], block))
+                opened.append(run)
+                levels[level] = []
+                level += 1
+
+        # merge leftover runs in passes of at most fanIn
+        runs = [run for level in levels for run in level]
+        while len(runs) > fanIn:
+            runs = [writeRun(mergeRuns(runs[i:i + fanIn], block))
+                    for i in range(0, len(runs), fanIn)]
+            opened.extend(runs)
+
+        yield from mergeRuns(runs, block)
+
+    finally:
+        for run in opened:
+            run.close()
+
+
+def writeRun(records):
+    """ Writes (key, event, guard) records to a new temporary run file;
+        returns it rewound for reading. """
 
-        # store date/time and action
-        lines[i] = [[int(lineDateTime.group(j)) for j in range(1,6)],
-                    line[lineDateTime.span()[1]+1:]]
+    run = tempfile.TemporaryFile()
+    for record in records:
+        run.write(RECORD.pack(*record))
+    run.seek(0)
+    return run
 
-    # sort actions by date/time
-    sortedLines = sorted(lines, key=lambda x:x[0])
 
-    # calculate sleep schedules for each guard
-    guardSleepCounts = {}
+def mergeRuns(runs, block):
+    """ Yields the records of sorted run files in order, reading block
+        records at a time from each; closes the runs once merged. """
+
+    yield from heapq.merge(*[readRun(run, block) for run in runs])
+    for run in runs:
+        run.close()
+
+
+def readRun(run, block=4096):
+    """ Yields packed (key, event, guard) records from a run file. """
+
+    while True:
+        data = run.read(RECORD.size * block)
+        if not data:
+            break
+        yield from RECORD.iter_unpack(data)
+
+
+def getSleepCounts(keys, events, guards, span=60):
+    """ Given sorted log arrays, returns a SleepMatrix of each guard's count
+        of nights asleep on every minute of the span. """
+
+    return accumulateSleep(zip(keys, events, guards), span)
+
+
+def shiftMidnight(key):
+    """ Returns the minute key of the midnight nearest a shift's start. """
+
+    return (key + 720) // 1440 * 1440
+
+
+def clipInterval(midnight, asleep, awake, span=60):
+    """ Given a shift's midnight and minute keys of falling asleep and
+        waking, returns the (start, end) minutes after midnight slept within
+        the span, or None if none were. """
+
+    start = min(max(asleep - midnight, 0), span)
+    end   = min(max(awake - midnight, 0), span)
+    return (start, end) if start < end else None
+
+
+def accumulateSleep(records, span=60):
+    """ Given sorted (key, event, guard) records, returns a SleepMatrix of
+        each guard's count of nights asleep on every minute of the span.
+        The span (1 to 1440 minutes) starts at the midnight nearest each
+        shift's start; sleep outside it is ignored. """
+
+    if not 1 <= span <= 1440:
+        raise ValueError("span must be between 1 and 1440 minutes")
+
+    matrix = SleepMatrix(span)
     currentGuard = None
-    lastSleptMin = None
-    for date, line in sortedLines:
+    midnight = None
+    lastSlept = None
+    for key, event, guard in records:
 
-        # save current guard number
-        lineGuard = RBegin.search(line)
-        if lineGuard:
-            currentGuard = int(lineGuard.group(1))
+        # save current guard number and midnight of their shift
+        if event == BEGIN:
+            currentGuard = guard
+            midnight = shiftMidnight(key)
 
         # save minute when fell asleep
-        elif RSleep.search(line):
-            if currentGuard not in guardSleepCounts:
-                guardSleepCounts[currentGuard] = [0] * 60
-            lastSleptMin = date[-1]
+        elif event == SLEEP:
+            matrix.addGuard(currentGuard)
+            if midnight is None:
+                midnight = shiftMidnight(key)
+            lastSlept = key
+
+        # mark minutes asleep within span
+        elif event == WAKE and lastSlept is not None:
+            interval = clipInterval(midnight, lastSlept, key, span)
+            if interval:
+                matrix.addInterval(currentGuard, *interval)
+            lastSlept = None
+
+    return matrix
+
+
+class LiveSleepStats:
+    """ Guard sleep statistics updated one log entry at a time; entries
+        may arrive out of order. Entries are kept in per-shift buckets so
+        each one only re-applies the shift(s) it touches. """
+
+    COMPACT = 4     # stale heap entries allowed per live entry
+
+    def __init__(self):
+        self.starts  = []           # sorted shift-start keys
+        self.onDuty  = {}           # shift-start key -> guard ID
+        self.buckets = {None: []}   # shift-start key -> sorted (key, event)
+                                    # (None: entries before any shift)
+        self.applied = {}   # shift-start key -> intervals applied
+        self.counts  = {}   # guard ID -> nights asleep on each minute
+        self.totals  = {}   # guard ID -> total minutes asleep
+        self.mostAsleep = []    # heap of (-total, guard)
+        self.mostMinute = []    # heap of (-count, guard, minute)
+
+    def shiftOf(self, key):
+        """ Returns the start key of the latest shift starting at or
+            before key (None if none). """
+
+        i = bisect.bisect_right(self.starts, key)
+        return self.starts[i-1] if i else None
+
+    def add(self, record):
+        """ Inserts a (key, event, guard) record and re-applies the
+            shifts it affects. """
+
+        key, event, guard = record
+
+        # sleeping or waking belongs to the shift before it
+        if event != BEGIN:
+            shift = self.shiftOf(key)
+            bisect.insort(self.buckets[shift], (key, event))
+            self.applyShift(shift)
+            return
+
+        # a known shift just changes guard
+        if key in self.onDuty:
+            self.onDuty[key] = guard
+            self.applyShift(key)
+            return
+
+        # a new shift takes the later entries of the shift before it
+        before = self.shiftOf(key)
+        bisect.insort(self.starts, key)
+        self.onDuty[key] = guard
+        entries = self.buckets[before]
+        cut = bisect.bisect_left(entries, (key, BEGIN))
+        self.buckets[key] = entries[cut:]
+        del entries[cut:]
+
+        self.applyShift(before)
+        self.applyShift(key)
+
+    def applyShift(self, shift):
+        """ Replaces the intervals applied for the shift starting at the
+            given key. """
+
+        # undo previous intervals
+        for guard, asleep, awake in self.applied.pop(shift, []):
+            self.mark(guard, asleep, awake, -1)
+
+        # entries before any shift have no guard yet
+        if shift is None:
+            return
+
+        # pair each sleep with the next wake, within the midnight hour
+        guard = self.onDuty[shift]
+        midnight = shiftMidnight(shift)
+        intervals = []
+        asleep = None
+        for key, event in self.buckets[shift]:
+            if event == SLEEP:
+                asleep = key
+            elif asleep is not None:
+                interval = clipInterval(midnight, asleep, key)
+                if interval:
+                    intervals.append((guard, *interval))
+                asleep = None
+
+        # apply new intervals
+        for guard, asleep, awake in intervals:
+            self.mark(guard, asleep, awake, 1)
+        self.applied[shift] = intervals
+
+    def mark(self, guard, asleep, awake, delta):
+        """ Adds delta nights asleep to a guard's minutes in an interval. """
+
+        counts = self.counts.setdefault(guard, [0] * 60)
+        for minute in range(asleep, awake):
+            counts[minute] += delta
+            heapq.heappush(self.mostMinute, (-counts[minute], guard, minute))
+        self.totals[guard] = self.totals.get(guard, 0) + \
+            delta * (awake - asleep)
+        heapq.heappush(self.mostAsleep, (-self.totals[guard], guard))
+
+        # rebuild heaps once mostly outdated
+        if len(self.mostMinute) > self.COMPACT * 60 * len(self.counts):
+            self.mostMinute = [(-count, guard, minute)
+                               for guard, counts in self.counts.items()
+                               for minute, count in enumerate(counts)
+                               if count]
+            heapq.heapify(self.mostMinute)
+        if len(self.mostAsleep) > self.COMPACT * len(self.totals):
+            self.mostAsleep = [(-total, guard)
+                               for guard, total in self.totals.items()
+                               if total]
+            heapq.heapify(self.mostAsleep)
+
+    def strategyOne(self):
+        """ Returns the guard asleep the most and their sleepiest minute
+            (None if no one has slept). """
+
+        # drop outdated totals
+        heap = self.mostAsleep
+        while heap and -heap[0][0] != self.totals[heap[0][1]]:
+            heapq.heappop(heap)
+        if not heap or heap[0][0] == 0:
+            return None
+
+        guard = heap[0][1]
+        return guard, argmax(self.counts[guard])
+
+    def strategyTwo(self):
+        """ Returns the guard and minute most often slept together
+            (None if no one has slept). """
+
+        # drop outdated counts
+        heap = self.mostMinute
+        while heap and -heap[0][0] != self.counts[heap[0][1]][heap[0][2]]:
+            heapq.heappop(heap)
+        if not heap or heap[0][0] == 0:
+            return None
+
+        return heap[0][1:]
+
+
+class SleepHistory:
+    """ Per-guard cumulative minute histograms over nights, so sleep counts
+        between any two dates come from subtracting two rows. Each row has
+        60 minute counts followed by the total minutes asleep. """
+
+    WIDTH = 61
+
+    def __init__(self, records):
+        """ Builds history from sorted (key, event, guard) records. """
+
+        # count minutes asleep per guard per night
+        nights = {}
+        currentGuard = None
+        midnight = None
+        lastSlept = None
+        for key, event, guard in records:
+            if event == BEGIN:
+                currentGuard = guard
+                midnight = shiftMidnight(key)
+            elif event == SLEEP:
+                if midnight is None:
+                    midnight = shiftMidnight(key)
+                lastSlept = key
+            elif event == WAKE and lastSlept is not None:
+                interval = clipInterval(midnight, lastSlept, key)
+                lastSlept = None
+                if not interval:
+                    continue
+                night = nights.setdefault(currentGuard, {})
+                counts = night.setdefault(midnight // 1440, [0] * 60)
+                for i in range(*interval):
+                    counts[i] += 1
+
+        # stack nights into running totals
+        self.days = {}      # guard ID -> ordinal of each night
+        self.rows = {}      # guard ID -> cumulative rows (first is zeros)
+        for guard, night in nights.items():
+            self.days[guard] = array('q', sorted(night))
+            rows = array('i', [0]) * self.WIDTH
+            for day in self.days[guard]:
+                row = [a + b for a, b in zip(rows[-self.WIDTH:-1],
+                                             night[day])]
+                rows.extend(array('i', row + [sum(row)]))
+            self.rows[guard] = rows
+
+    def save(self, path):
+        """ Writes the history to a file: a header, then each guard's ID
+            and night count followed by its nights and rows, little-endian. """
+
+        with open(path, "wb") as file:
+            file.write(HISTORY_HEADER.pack(HISTORY_MAGIC, len(self.days)))
+            for guard, days in self.days.items():
+                file.write(HISTORY_GUARD.pack(guard, len(days)))
+                for values in (days, self.rows[guard]):
+                    if sys.byteorder == "big":
+                        values = array(values.typecode, values)
+                        values.byteswap()
+                    values.tofile(file)
+
+    @classmethod
+    def load(cls, path):
+        """ Reads a history written by save. """
+
+        history = cls([])
+        with open(path, "rb") as file:
+            magic, guards = HISTORY_HEADER.unpack(
+                file.read(HISTORY_HEADER.size))
+            if magic != HISTORY_MAGIC:
+                raise ValueError("not a sleep history file: " + path)
+
+            for _ in range(guards):
+                guard, nights = HISTORY_GUARD.unpack(
+                    file.read(HISTORY_GUARD.size))
+                days, rows = array('q'), array('i')
+                days.fromfile(file, nights)
+                rows.fromfile(file, (nights + 1) * cls.WIDTH)
+                if sys.byteorder == "big":
+                    days.byteswap()
+                    rows.byteswap()
+                history.days[guard], history.rows[guard] = days, rows
+
+        return history
+
+    def counts(self, guard, start, end):
+        """ Returns a guard's nights asleep on each minute, plus total
+            minutes asleep, between two dates (inclusive). """
+
+        days = self.days.get(guard, array('q'))
+        lo = bisect.bisect_left(days, start.toordinal()) * self.WIDTH
+        hi = bisect.bisect_right(days, end.toordinal()) * self.WIDTH
+        rows = self.rows.get(guard, array('i', [0]) * self.WIDTH)
+        return [b - a for a, b in zip(rows[lo:lo + self.WIDTH],
+                                      rows[hi:hi + self.WIDTH])]
+
+    def sleepiestMinute(self, guard, start, end):
+        """ Returns a guard's most-slept minute between two dates
+            (None if the guard never slept). """
+
+        counts = self.counts(guard, start, end)
+        return argmax(counts[:60]) if counts[60] else None
+
+    def sleepiestGuard(self, start, end):
+        """ Returns the guard asleep the most between two dates
+            (None if no one slept). """
+
+        totals = {guard: self.counts(guard, start, end)[60]
+                  for guard in self.rows}
+        guard = max(totals, key=totals.get, default=None)
+        return guard if guard is not None and totals[guard] else None
+
+
+def followLog(path, stats, delay=1.0):
+    """ Watches a log file, adding each new complete line to the live
+        stats and reporting both strategies after every update. """
+
+    with open(path) as file:
+        partial = ""
+        while True:
+            text = partial + file.read()
+
+            # wait for more lines
+            if "\n" not in text:
+                partial = text
+                time.sleep(delay)
+                continue
+
+            # keep any incomplete last line for later
+            cut = text.rindex("\n") + 1
+            partial = text[cut:]
+            for record in zip(*parseLog(text[:cut])):
+                stats.add(record)
+
+            # report current answers
+            for part, answer in ((1, stats.strategyOne()),
+                                 (2, stats.strategyTwo())):
+                if answer:
+                    print("Part {} guard ID * minute: {}"
+                          "".format(part, answer[0] * answer[1]), flush=True)
 
-        # increment counts of minutes asleep
-        elif RAwake.search(line):
-            awokenMin = date[-1]
-            for i in range(lastSleptMin, awokenMin):
-                guardSleepCounts[currentGuard][i] += 1
 
-    # PART ONE
-                
-    # find guard who slept the most
-    highest = 0
-    chosenGuard = None
-    for guard in guardSleepCounts:
-
-        # look for a sum with higher count
-        minutesSlept = sum(guardSleepCounts[guard])
-        if minutesSlept > highest:
-            highest = minutesSlept
-            chosenGuard = guard
-
-    # find minute slept the most
-    count = 0
-    chosenMinute = None
-    minutes = guardSleepCounts[chosenGuard]
-    for i in range(len(minutes)):
-        if minutes[i] > count:
-            count = minutes[i]
-            chosenMinute = i
+def main():
 
-    print("Part 1 guard ID * minute:", chosenGuard * chosenMinute)
+    # follow a growing log file
+    if len(sys.argv) > 2 and sys.argv[1] == "--follow":
+        followLog(sys.argv[2], LiveSleepStats())
+        return
 
 
-    # PART TWO
+    # get input, sort actions by date/time and calculate sleep schedules
+    # (within a memory budget in bytes, if given)
+    if len(sys.argv) > 1:
+        sleepCounts = accumulateSleep(sortLogExternal(sys.stdin,
+                                                      int(sys.argv[1])))
+    else:
+        sleepCounts = getSleepCounts(*sortLog(*parseLog(sys.stdin.read())))
 
-    # find most-frequently slept minute and guard
-    count = 0
-    for guard in guardSleepCounts:
-        minutes = guardSleepCounts[guard]
-
-        # look for a minute with higher count
-        for i in range(len(minutes)):
-            if minutes[i] > count:
-                count = minutes[i]
-                chosenMinute = i
-                chosenGuard = guard
+    # PART ONE
+    # find guard who slept the most and their most-slept minute
+    chosenGuard, chosenMinute = sleepCounts.strategyOne()
+    print("Part 1 guard ID * minute:", chosenGuard * chosenMinute)
 
+    # PART TWO
+    # find most-frequently slept minute and guard
+    chosenGuard, chosenMinute = sleepCounts.strategyTwo()
     print("Part 2 guard ID * minute:", chosenGuard * chosenMinute)
 
 
@@ -41,69 +41,153 @@ For example, again using the polymer dabAcCaCBAcCcaDA from above:
 In this example, removing all C/c units was best, producing the answer 4. What is the length of the shortest polymer you can produce by removing all units of exactly one type and fully reacting the result?
 """
 
-import sys
+import os, sys
+from multiprocessing import Pool
+
+# polymer shared with each worker process
+sharedPolymer = b""
 
 
 def reactPolymer(polymer):
-    """ Destroys all reactive pairs in given polymer until no more reactions
-        can occur; returns resulting polymer. """
-
-    toCheck = 0
-    while toCheck < len(polymer) - 1:
-        
-        # remove current and next element if they'll be destroyed
-        if willDestroy(polymer[toCheck], polymer[toCheck+1]):
-            polymer.pop(toCheck)
-            polymer.pop(toCheck)
-
-            # move back to check previous element w new neighbor
-            if toCheck > 0:
-                toCheck -= 1
-
-        # otherwise, increment index from which to check
+    """ Destroys all reactive pairs in given polymer (bytes) until no more
+        reactions can occur; returns resulting polymer. """
+
+    return bytes(reactInto(bytearray(), polymer))
+
+
+def reactInto(stack, units):
+    """ Reacts units onto a stack of already-reacted units;
+        returns the stack. """
+
+    for unit in units:
+
+        # destroy unit and top of stack if they react
+        if stack and willDestroy(stack[-1], unit):
+            stack.pop()
         else:
-            toCheck += 1
+            stack.append(unit)
+
+    return stack
+
+
+def reactStream(stream, chunkSize=1 << 20):
+    """ Reacts a polymer read from a binary stream in fixed-size chunks,
+        keeping only the surviving units; returns them as a bytearray. """
+
+    stack = bytearray()
+    while True:
+        chunk = stream.read(chunkSize)
+        if not chunk:
+            break
+        reactInto(stack, chunk.translate(None, b" \t\r\n"))
+
+    return stack
+
+
+def reactParallel(polymer, processes=None, minChunk=1 << 20):
+    """ Reacts chunks of the polymer in separate processes, then joins the
+        reacted chunks pairwise; returns resulting polymer. """
+
+    # not worth splitting small polymers
+    processes = min(processes or os.cpu_count() or 1,
+                    len(polymer) // minChunk)
+    if processes <= 1:
+        return reactPolymer(polymer)
+
+    # react each chunk
+    bounds = [len(polymer) * i // processes for i in range(processes + 1)]
+    chunks = [polymer[start:end] for start, end in zip(bounds, bounds[1:])]
+    with Pool(processes) as pool:
+        chunks = pool.map(reactPolymer, chunks)
+
+    # join neighboring chunks until one remains
+    while len(chunks) > 1:
+        joined = [joinReacted(chunks[i], chunks[i+1])
+                  for i in range(0, len(chunks) - 1, 2)]
+        if len(chunks) % 2:
+            joined.append(chunks[-1])
+        chunks = joined
+
+    return chunks[0]
+
+
+def joinReacted(left, right):
+    """ Joins two fully reacted polymers, destroying pairs that react
+        across the boundary. """
+
+    # count pairs reacting outward from the boundary
+    pairs = 0
+    while pairs < min(len(left), len(right)) and \
+          willDestroy(left[-1 - pairs], right[pairs]):
+        pairs += 1
+
+    return left[:len(left) - pairs] + right[pairs:]
 
-    return ''.join(polymer)
-    
 
 def willDestroy(left, right):
-    """ Determines whether or not given characters are equivalent letters
-        but different cases. """
+    """ Determines whether or not given units (ASCII letter codes) are
+        equivalent letters but different cases. """
     
-    return left.upper() == right.upper() and left != right
+    return left ^ right == 0x20
 
 
 def findFewestUnits(polymer):
     """ Determines the shortest possible length of the reacted polymer
         if a single letter may be entirely removed first (both cases). """
 
-    # get all letters used
-    letters = set()
-    for char in polymer:
-        letters.add(char.upper())
+    return min(getUnitLengths(polymer).values(), default=0)
 
-    # find shortest reacted polymer
-    shortest = float('inf')
-    for letter in letters:
 
-        # try removing a letter (both cases)
-        newPolymer = polymer.replace(letter, '')
-        newPolymer = newPolymer.replace(letter.lower(), '')
+def getUnitLengths(polymer, processes=None, minChunk=1 << 20):
+    """ Returns the reacted polymer length after removing each letter
+        (both cases), keyed by lowercase letter; letters are tried in
+        parallel over a polymer shared once with each process. """
 
-        # save reacted polymer length if shortest so far
-        shortest = min(shortest, len(reactPolymer(list(newPolymer))))
-        
-    return shortest
+    # get all letters used (lowercase)
+    letters = sorted(set(polymer.lower()))
 
+    # not worth starting processes for small polymers
+    if len(polymer) < minChunk or (processes or os.cpu_count() or 1) <= 1:
+        setPolymer(polymer)
+        lengths = [reactWithout(letter) for letter in letters]
 
-def main():
+    # react without each letter in parallel
+    else:
+        with Pool(processes, initializer=setPolymer,
+                  initargs=(polymer,)) as pool:
+            lengths = pool.map(reactWithout, letters)
+
+    return {chr(letter): length for letter, length in zip(letters, lengths)}
 
-    # get input
-    polymer = sys.stdin.readline().strip()
+
+def setPolymer(polymer):
+    """ Stores the polymer for reactWithout in this or a worker process. """
+
+    global sharedPolymer
+    sharedPolymer = polymer
+
+
+def reactWithout(letter):
+    """ Returns the reacted length of the shared polymer with a letter
+        removed (both cases). """
+
+    return len(reactPolymer(sharedPolymer.translate(
+        None, bytes([letter, letter ^ 0x20]))))
+
+
+def main():
 
     # PART ONE
-    newPolymer = reactPolymer(list(polymer))
+    # stream input, writing reacted polymer to a file if given
+    if len(sys.argv) > 1:
+        newPolymer = reactStream(sys.stdin.buffer)
+        with open(sys.argv[1], "wb") as output:
+            output.write(newPolymer)
+
+    # or react whole input in parallel
+    else:
+        polymer = sys.stdin.buffer.readline().strip()
+        newPolymer = reactParallel(polymer)
     print("There are", len(newPolymer), "units remaining in the reacted polymer.")
 
     # PART TWO
@@ -72,96 +72,121 @@ Your actual region will need to be much larger than this example, though, instea
 """
 
 import sys
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
 
+TIED = -1     # label of spots equally close to several coordinates
 
-def getLargestArea(coords):
-    """ Given list of coordinates """
-
-    # calculate boundaries
-    maxX = max(x for [x,y] in coords)
-    maxY = max(y for [x,y] in coords)
-    minX = min(x for [x,y] in coords)
-    minY = min(y for [x,y] in coords)
-    
-    # build grid
-    grid = []
-    for y in range(maxY+1):
-        grid.append([0] * (maxX+1))
 
-    # calculate closest points
-    for y in range(len(grid)):
-        for x in range(len(grid[y])):
+def getLargestArea(coords):
+    """ Given list of coordinates, returns the size of the largest
+        area closest to a single coordinate that isn't infinite. """
 
-            # skip areas leading to infinity
-            if x <= minX or x >= maxX or y <= minY or y >= maxY:
-                continue
+    # label each spot w its closest point
+    width = max(x for [x,y] in coords) - min(x for [x,y] in coords) + 1
+    labels = labelGrid(coords)
 
-            # save closest point in spot (None if tied)
-            grid[y][x] = getClosestPoint(x, y, coords)
+    # areas touching the bounding box's border lead to infinity
+    infinite = set(labels[:width]) | set(labels[-width:]) | \
+               set(labels[::width]) | set(labels[width-1::width])
 
     # find the largest area
-    area = 0
-    for x,y in coords:
-        
-        # skip points with infinite areas
-        if x in (minX, maxX) or y in (minY, maxY):
-            continue
+    areas = getAreas(labels)
+    return max((areas[label] for label in range(len(coords))
+                if label not in infinite), default=0)
 
-        area = max(area, getArea((x,y), grid))
-    
-    return area
 
+def labelGrid(coords):
+    """ Given list of coordinates, labels every spot in their bounding box
+        w the index of its closest coordinate (TIED if tied) by expanding
+        from all coordinates at once; returns labels row by row. """
 
-def getClosestPoint(ptx, pty, coords):
-    """ Given a point and a list of coordinates, finds the closest point. 
-        Returns the closest coordinates or None if tied. """
-    
-    # calculate distances
-    distance = {}
-    for x, y in coords:
-        distance[(x,y)] = abs(x - ptx) + abs(y - pty)
-
-    # find closest
-    smallest = min(distance.values())
-    points = [pt for pt in distance if distance[pt] == smallest]
-    return points[0] if len(points) == 1 else None
-
+    # calculate boundaries
+    minX = min(x for [x,y] in coords)
+    minY = min(y for [x,y] in coords)
+    width  = max(x for [x,y] in coords) - minX + 1
+    height = max(y for [x,y] in coords) - minY + 1
+    UNSEEN = -2
+    labels = array('i', [UNSEEN]) * (width * height)
+
+    # start from the coordinates themselves
+    frontier = {}
+    for label, (x, y) in enumerate(coords):
+        spot = (y - minY) * width + (x - minX)
+        frontier[spot] = label if frontier.get(spot, label) == label else TIED
+
+    # label spots one distance at a time
+    while frontier:
+        for spot, label in frontier.items():
+            labels[spot] = label
+
+        # claim unlabeled neighbors; tie if reached by different labels
+        reached = {}
+        for spot, label in frontier.items():
+            x = spot % width
+            for neighbor in (spot - width, spot + width,
+                             spot - 1 if x > 0 else -1,
+                             spot + 1 if x < width - 1 else -1):
+                if 0 <= neighbor < len(labels) and labels[neighbor] == UNSEEN:
+                    if reached.get(neighbor, label) != label:
+                        reached[neighbor] = TIED
+                    else:
+                        reached[neighbor] = label
+        frontier = reached
+
+    return labels
+
+
+def getAreas(labels):
+    """ Given a label grid, returns the area that each label commands
+        (i.e. spots closest to that point). """
+
+    return Counter(labels)
+
+
+def getSafeArea(coords, threshold=10000):
+    """ Given a list of coordinates, calculates the number of spots within a
+        safe distance of every point (where total distance < threshold).
+        Total distance splits into an x part and a y part, so each axis is
+        summed separately and qualifying pairs counted. """
 
-def getArea(pt, grid):
-    """ Given coordinates and a grid, returns the area that the
-        given point commands (i.e. spots closest to this point). """
+    # total distance along each axis for every position that could qualify
+    columns = sorted(getDistanceSums([x for x, y in coords], threshold))
+    rows    = sorted(getDistanceSums([y for x, y in coords], threshold))
 
-    area = 0    
-    for y in range(len(grid)):
-        for x in range(len(grid[y])):
-            if grid[y][x] == pt:
-                area += 1
-    return area           
+    # count pairs under threshold; rows[:j] fit w the current column
+    safeSpots = 0
+    j = len(rows)
+    for column in columns:
+        while j > 0 and column + rows[j-1] >= threshold:
+            j -= 1
+        safeSpots += j
 
+    return safeSpots
 
-def getSafeArea(coords):
-    """ Given a list of coordinates, calculates the number of spots within a
-        safe distance of every point (where total distance < 10000). """
 
-    # get boundaries
-    maxX = max(x for [x,y] in coords)
-    maxY = max(y for [x,y] in coords)    
+def getDistanceSums(values, threshold):
+    """ Given positions along one axis, returns the total distance to all of
+        them from every position whose total is under threshold. """
 
-    # calculate each spot's total distance
-    safeSpots = 0
-    for y in range(maxY+1):
-        for x in range(maxX+1):
-            total = 0
+    values = sorted(values)
+    prefix = [0] + list(accumulate(values))
+    n = len(values)
 
-            # calculate distance from each point
-            for ptx, pty in coords:
-                total += abs(x - ptx) + abs(y - pty)
+    # past the ends, each step away adds n to the total
+    reach = threshold // n + 1
+    sums = []
+    for pos in range(values[0] - reach, values[-1] + reach + 1):
 
-            # safe if within 10000 total
-            if total < 10000:
-                safeSpots += 1
+        # distance to positions at or below plus distance to those above
+        k = bisect_right(values, pos)
+        total = (pos * k - prefix[k]) + (prefix[n] - prefix[k] - pos * (n - k))
+        if total < threshold:
+            sums.append(total)
 
-    return safeSpots
+    return sums
     
 
 def main():
@@ -177,7 +202,7 @@ def main():
     print("The largest finite area is", area)
 
     # PART TWO
-    safeArea = getSafeArea(coords)
+    safeArea = getSafeArea(coords, 10000)
     print("The safe region has an area of", safeArea)
     
 